@@ -31,7 +31,10 @@ Notes:
 import os
 import sys
 import argparse
+import asyncio
+import hashlib
 import io
+from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image
 
@@ -40,6 +43,7 @@ _have_transformers = False
 _have_torch = False
 _have_flask = False
 _have_requests = False
+_have_aiohttp = False
 
 try:
     import transformers
@@ -54,7 +58,7 @@ except Exception:
     _have_torch = False
 
 try:
-    from flask import Flask, request, render_template_string, send_from_directory
+    from flask import Flask, request, send_from_directory
     _have_flask = True
 except Exception:
     _have_flask = False
@@ -65,6 +69,21 @@ try:
 except Exception:
     _have_requests = False
 
+try:
+    import aiohttp
+    _have_aiohttp = True
+except Exception:
+    _have_aiohttp = False
+
+# orjson parses the small caption payloads 3-5x faster than stdlib json and
+# skips the intermediate str decode; fall back silently when not installed
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
 # ---------------------------
 # Helper: pip install hint
 # ---------------------------
@@ -73,11 +92,85 @@ def pip_install_hint(packages):
     print("    pip install " + " ".join(packages))
     print("On Colab, prefix with ! in a cell, e.g.:")
     print("    !pip install " + " ".join(packages))
+    print("For faster image decode/resize on x86, consider pillow-simd (drop-in Pillow replacement):")
+    print("    pip install pillow-simd")
     print()
 
+# ---------------------------
+# Image preprocessing
+# ---------------------------
+# BLIP's vision encoder ingests 384x384, so anything much bigger is wasted
+# upload bytes in API mode and wasted CPU in the processor's resize locally.
+_MAX_SIDE = 512
+# uploads whose post-draft size still exceeds this are refused outright
+_MAX_UPLOAD_SIDE = 4096
+
+def _downscale(img, max_side=_MAX_SIDE):
+    """Return an RGB copy of `img` shrunk so its longest side is <= max_side."""
+    img = img.convert("RGB")
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    return img
+
+def _open_small(path_or_fileobj, max_side=_MAX_SIDE):
+    """Open an image, asking libjpeg to decode at reduced scale when it can."""
+    img = Image.open(path_or_fileobj)
+    # for JPEGs, draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale
+    # directly -- far cheaper than decoding full-res and shrinking after;
+    # it's a no-op for other formats
+    img.draft("RGB", (max_side, max_side))
+    return img
+
+def _prep(path_or_fileobj, max_side=_MAX_SIDE):
+    """Open an image, downscale it and re-encode as an in-memory JPEG buffer."""
+    img = _downscale(_open_small(path_or_fileobj, max_side), max_side)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    buf.seek(0)
+    return buf
+
 # ---------------------------
 # Hugging Face Inference API
 # ---------------------------
+# Resolve the token once at import: no environ lookup or rebuilt headers
+# dict on the per-request path.
+_HF_TOKEN = os.environ.get("HF_API_TOKEN")
+_HF_HEADERS = None
+if _HF_TOKEN:
+    _HF_HEADERS = {
+        "Authorization": f"Bearer {_HF_TOKEN}",
+        "X-use-cache": "true",
+        "Content-Type": "application/octet-stream",
+    }
+
+# response keys seen across caption models, in likelihood order
+_CAPTION_KEYS = ("generated_text", "caption", "text")
+
+def _parse_caption_response(j):
+    """Pull the caption string out of the API's list-or-dict response."""
+    obj = j[0] if isinstance(j, list) and len(j) > 0 else j
+    if isinstance(obj, dict):
+        for key in _CAPTION_KEYS:
+            v = obj.get(key)
+            if v:
+                return v.strip()
+        # fallback: join values
+        return " ".join(str(v) for v in obj.values()).strip()
+    return str(j)
+
+# Shared session: keeps TCP+TLS connections to the HF endpoint alive instead
+# of paying a fresh handshake on every call.
+_hf_session = None
+if _have_requests:
+    from requests.adapters import HTTPAdapter
+    try:
+        from urllib3.util.retry import Retry
+        _hf_retries = Retry(total=2, backoff_factor=0.3)
+    except Exception:
+        _hf_retries = 2
+    _hf_session = requests.Session()
+    _hf_session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=_hf_retries))
+
 def caption_via_hf_api(image_path_or_fileobj, hf_token=None, model="Salesforce/blip-image-captioning-base", max_length=40):
     """
     image_path_or_fileobj: path string or file-like object (binary)
@@ -85,89 +178,187 @@ def caption_via_hf_api(image_path_or_fileobj, hf_token=None, model="Salesforce/b
     """
     if not _have_requests:
         raise RuntimeError("requests library not installed. pip install requests")
-    token = hf_token or os.environ.get("HF_API_TOKEN")
+    token = hf_token or _HF_TOKEN
     if not token:
         raise RuntimeError("Hugging Face API token not provided. Set HF_API_TOKEN env var or pass hf_token.")
     url = f"https://api-inference.huggingface.co/models/{model}"
-    headers = {"Authorization": f"Bearer {token}"}
+    # x-use-cache lets HF serve identical requests from its server-side cache;
+    # reuse the precomputed headers unless a different token was passed in
+    headers = _HF_HEADERS if token == _HF_TOKEN else {
+        "Authorization": f"Bearer {token}",
+        "X-use-cache": "true",
+        "Content-Type": "application/octet-stream",
+    }
     # handle both path and file-like object
     if isinstance(image_path_or_fileobj, str):
-        f = open(image_path_or_fileobj, "rb")
+        # downscale before upload: 10-50x fewer bytes for phone photos
+        f = _prep(image_path_or_fileobj)
         close_after = True
     else:
         f = image_path_or_fileobj
         close_after = False
-    files = {"inputs": f}
-    params = {"options": {"wait_for_model": True}, "parameters": {"max_new_tokens": max_length}}
-    # The inference API accepts form posts (some models) — handle basic usage:
-    resp = requests.post(url, headers=headers, files=files, params=None, data=None, timeout=120)
+    # The inference API takes the raw image bytes as the POST body; passing
+    # the open file streams it in chunks instead of building a multipart
+    # form copy in memory.
+    resp = _hf_session.post(url, headers=headers, data=f, timeout=120)
     if close_after:
         f.close()
     if resp.status_code != 200:
         raise RuntimeError(f"Hugging Face API error {resp.status_code}: {resp.text}")
-    # response likely a list of dicts or dict with generated_text - handle both
-    j = resp.json()
-    # common format: [{'generated_text': 'A dog ...'}]
-    if isinstance(j, list) and len(j) > 0 and isinstance(j[0], dict):
-        # try many keys
-        for key in ("generated_text", "caption", "text"):
-            if key in j[0]:
-                return j[0][key].strip()
-        # fallback: join values
-        return " ".join(str(v) for v in j[0].values()).strip()
-    elif isinstance(j, dict):
-        # maybe {'generated_text': '...'}
-        for key in ("generated_text", "caption", "text"):
-            if key in j:
-                return j[key].strip()
-        return str(j).strip()
-    else:
-        return str(j)
+    # response is a list of dicts or a dict with generated_text - handle both
+    return _parse_caption_response(_loads(resp.content))
+
+def caption_via_hf_api_many(image_paths, hf_token=None, model="Salesforce/blip-image-captioning-base", max_length=40, concurrency=8):
+    """
+    Caption several images via the HF Inference API with overlapped requests.
+    The endpoint's latency is mostly server-side model time, so issuing the
+    round-trips concurrently (bounded by `concurrency` to respect rate
+    limits) makes wall time track server latency instead of N serial calls.
+    Falls back to a serial loop if aiohttp is not installed.
+    """
+    if not _have_aiohttp:
+        return [caption_via_hf_api(p, hf_token=hf_token, model=model, max_length=max_length) for p in image_paths]
+    token = hf_token or _HF_TOKEN
+    if not token:
+        raise RuntimeError("Hugging Face API token not provided. Set HF_API_TOKEN env var or pass hf_token.")
+    url = f"https://api-inference.huggingface.co/models/{model}"
+    headers = {"Authorization": f"Bearer {token}", "X-use-cache": "true"}
+
+    async def _run():
+        sem = asyncio.Semaphore(concurrency)
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+            async def _one(path):
+                payload = _prep(path).getvalue()
+                async with sem:
+                    async with session.post(url, data=payload) as resp:
+                        if resp.status != 200:
+                            raise RuntimeError(f"Hugging Face API error {resp.status}: {await resp.text()}")
+                        j = _loads(await resp.read())
+                return _parse_caption_response(j)
+            return await asyncio.gather(*[_one(p) for p in image_paths])
+
+    return asyncio.run(_run())
 
 # ---------------------------
 # Local pipeline (transformers)
 # ---------------------------
-_caption_pipeline = None
-def ensure_local_pipeline(model_name="Salesforce/blip-image-captioning-base"):
-    global _caption_pipeline
-    if _caption_pipeline is not None:
-        return _caption_pipeline
+# Loaded once per process and reused by every caption call: the processor's
+# resize/normalize params in particular are parsed from JSON at load time
+# and shouldn't be re-resolved per request.
+_model = None
+_processor = None
+_device = None
+_dtype = None
+
+# Optional fixed text prompt for conditional captioning (e.g. "a photograph
+# of"). When set, the prompt is tokenized once at load time and prepended to
+# every generate call. Note we deliberately do NOT cache the prompt's decoder
+# K/V: BLIP's decoder layers interleave cross-attention with the image, so
+# the prompt's K/V above the first layer depend on the image and can't be
+# precomputed without it. Off by default; enable via the CAPTION_PROMPT env
+# var.
+CAPTION_PROMPT = os.environ.get("CAPTION_PROMPT")
+_prompt_ids = None  # tokenized prompt, set once at load time
+def ensure_local_pipeline(model_name="Salesforce/blip-image-captioning-base", quant=None):
+    """
+    quant: None for fp16 (GPU) / fp32 (CPU), or "int8" to quantize —
+    bitsandbytes 8-bit weights on CUDA (fits 4-6 GB cards), dynamic int8
+    linear layers on CPU.
+    """
+    global _model, _processor, _device, _dtype
+    if _model is not None:
+        return _model, _processor, _device, _dtype
     if not _have_transformers:
         raise RuntimeError("transformers not installed. pip install transformers")
     if not _have_torch:
         raise RuntimeError("torch not installed. pip install torch")
-    # create pipeline
+    # load model + processor explicitly (instead of pipeline()) so we control dtype
     try:
-        from transformers import pipeline
-        # set device to 0 if CUDA available, else cpu
-        device = 0 if torch.cuda.is_available() else -1
-        _caption_pipeline = pipeline("image-to-text", model=model_name, device=device)
-        return _caption_pipeline
+        from transformers import AutoProcessor, BlipForConditionalGeneration
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        # fp16 halves the bytes moved for weights/activations and enables
+        # tensor-core matmuls on GPU; CPU stays fp32
+        dtype = torch.float16 if device == "cuda" else torch.float32
+        if quant == "int8" and device == "cuda":
+            # 8-bit weights via bitsandbytes: ~4x less weight bandwidth,
+            # activations stay fp16
+            model = BlipForConditionalGeneration.from_pretrained(model_name, load_in_8bit=True, device_map="auto")
+        else:
+            model = BlipForConditionalGeneration.from_pretrained(model_name, torch_dtype=dtype).to(device)
+            if quant == "int8":
+                # CPU: dynamic int8 on the linear layers (uses VNNI where available)
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+        # compile for fused kernels / fewer per-op Python dispatches; the
+        # processor always resizes to the same 384x384 so shapes stay static
+        # and recompiles don't fire (skipped for quantized models, which
+        # torch.compile handles poorly)
+        if quant is None and hasattr(torch, "compile"):
+            try:
+                model = torch.compile(model, mode="reduce-overhead", fullgraph=False)
+            except Exception as e:
+                print("Warning: torch.compile unavailable, running eager:", e)
+        processor = AutoProcessor.from_pretrained(model_name)
+        if CAPTION_PROMPT:
+            global _prompt_ids
+            _prompt_ids = processor(text=CAPTION_PROMPT, return_tensors="pt").input_ids.to(device)
+        _model, _processor, _device, _dtype = model, processor, device, dtype
+        return _model, _processor, _device, _dtype
     except Exception as e:
-        raise RuntimeError("Failed to create pipeline: " + str(e))
+        raise RuntimeError("Failed to load model: " + str(e))
 
-def generate_caption_local(image_path_or_pil, max_length=40):
+def generate_caption_local(images, batch_size=8, max_length=40, num_beams=1):
     """
-    Accepts path string or PIL.Image
+    Accepts a path string or PIL.Image, or a list of them.
+    Lists are captioned in batched forward passes (one per batch instead of
+    per image), which is much faster on GPU.
+    Decoding is greedy by default (num_beams=1): ~3x fewer decoder FLOPs
+    than the beam-3 default BLIP ships with, for a marginal quality loss.
+    Returns a single caption for a single input, a list of captions for a list.
     """
-    pipe = ensure_local_pipeline()
-    # the pipeline accepts file path or PIL image
-    inputs = image_path_or_pil
+    from transformers import GenerationConfig
+    ensure_local_pipeline()
+    model, processor, device, dtype = _model, _processor, _device, _dtype
+    gen_config = GenerationConfig(num_beams=num_beams, do_sample=False, max_new_tokens=max_length)
+    single = not isinstance(images, (list, tuple))
+    if single:
+        images = [images]
+    # pre-open paths so the model gets ready-to-use RGB images
+    pil_images = []
+    for im in images:
+        if isinstance(im, str):
+            im = _open_small(im)
+        # shrink before the processor so its resize starts from <=512px
+        # instead of a full-resolution photo
+        pil_images.append(_downscale(im))
     try:
-        out = pipe(inputs, max_length=max_length, truncation=True)
-        if isinstance(out, list) and len(out) > 0:
-            # usually [{'generated_text': '...'}]
-            txt = out[0].get("generated_text") if isinstance(out[0], dict) else str(out[0])
-            return (txt or "").strip()
-        # fallback
-        return str(out)
+        captions = []
+        with torch.inference_mode():
+            for start in range(0, len(pil_images), batch_size):
+                batch = pil_images[start:start + batch_size]
+                inputs = processor(images=batch, return_tensors="pt")
+                pixel_values = inputs["pixel_values"]
+                if device == "cuda":
+                    # pinned host memory makes the H2D copy async: the CPU
+                    # can move on to queuing the generate call while the
+                    # copy engine streams the pixels over
+                    pixel_values = pixel_values.pin_memory().to(device=device, dtype=dtype, non_blocking=True)
+                else:
+                    pixel_values = pixel_values.to(device=device, dtype=dtype)
+                gen_kwargs = {"pixel_values": pixel_values, "generation_config": gen_config}
+                if _prompt_ids is not None:
+                    gen_kwargs["input_ids"] = _prompt_ids.expand(pixel_values.shape[0], -1)
+                out_ids = model.generate(**gen_kwargs)
+                captions.extend(t.strip() for t in processor.batch_decode(out_ids, skip_special_tokens=True))
+        return captions[0] if single else captions
     except Exception as e:
         raise RuntimeError("Model inference failed: " + str(e))
 
 # ---------------------------
 # Unified wrapper
 # ---------------------------
-def generate_caption(image_path, use_api=False, hf_token=None, model_name="Salesforce/blip-image-captioning-base", max_length=40):
+def generate_caption(image_path, use_api=False, hf_token=None, model_name="Salesforce/blip-image-captioning-base", max_length=40, num_beams=1):
     """
     image_path: path to image file
     use_api: if True, use Hugging Face Inference API
@@ -176,7 +367,48 @@ def generate_caption(image_path, use_api=False, hf_token=None, model_name="Sales
     if use_api:
         return caption_via_hf_api(image_path, hf_token=hf_token, model=model_name, max_length=max_length)
     else:
-        return generate_caption_local(image_path, max_length=max_length)
+        return generate_caption_local(image_path, max_length=max_length, num_beams=num_beams)
+
+def generate_caption_pil(img, use_api=False, hf_token=None, model_name="Salesforce/blip-image-captioning-base", max_length=40, num_beams=1):
+    """
+    Like generate_caption but takes an already-decoded PIL image, so callers
+    that have the bytes in hand (the Flask handler) skip the disk round-trip.
+    API mode re-encodes the downscaled image to an in-memory JPEG.
+    """
+    if use_api:
+        buf = io.BytesIO()
+        _downscale(img).save(buf, "JPEG", quality=85)
+        buf.seek(0)
+        return caption_via_hf_api(buf, hf_token=hf_token, model=model_name, max_length=max_length)
+    else:
+        return generate_caption_local(img, max_length=max_length, num_beams=num_beams)
+
+# ---------------------------
+# Caption cache
+# ---------------------------
+# Re-submitting the same image (common with UI re-clicks) skips the whole
+# forward pass: captions are cached by a hash of the raw image bytes.
+_caption_cache = {}
+_CAPTION_CACHE_MAX = 128
+
+def _caption_cache_key(image_bytes, model_name, max_length, use_api):
+    # the backend matters: local greedy decoding and the API's server-side
+    # defaults produce genuinely different captions for the same image
+    digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    return "%s:%s:%d:%s" % (digest, model_name, max_length, "api" if use_api else "local")
+
+def _caption_cache_get(key):
+    caption = _caption_cache.pop(key, None)
+    if caption is not None:
+        # reinsert so hits move to the back and eviction stays LRU
+        _caption_cache[key] = caption
+    return caption
+
+def _caption_cache_put(key, caption):
+    if len(_caption_cache) >= _CAPTION_CACHE_MAX:
+        # evict the oldest entry (dicts keep insertion order)
+        _caption_cache.pop(next(iter(_caption_cache)))
+    _caption_cache[key] = caption
 
 # ---------------------------
 # CLI and Flask web UI
@@ -203,14 +435,52 @@ HTML_TEMPLATE = """
 For API mode set environment variable <code>HF_API_TOKEN</code>.</p>
 """
 
-def run_flask_server(model_name="Salesforce/blip-image-captioning-base"):
+# Parse the template once at import; render_template_string would re-lex and
+# re-parse (or at least re-look-up) the string on every request.
+_tmpl = None
+if _have_flask:
+    from jinja2 import Environment
+    _tmpl = Environment(autoescape=True).from_string(HTML_TEMPLATE)
+
+# A single inference worker serializes GPU access across Flask's request
+# threads; a separate small pool handles disk I/O. PyTorch releases the GIL
+# inside its kernels, so one request's file handling overlaps with another's
+# inference.
+_infer_pool = ThreadPoolExecutor(max_workers=1)
+_io_pool = ThreadPoolExecutor(max_workers=2)
+
+def _write_bytes(path, data):
+    with open(path, "wb") as out:
+        out.write(data)
+
+def run_flask_server(model_name="Salesforce/blip-image-captioning-base", quant=None, use_api=False):
     if not _have_flask:
         raise RuntimeError("Flask not installed. pip install flask")
-    from flask import Flask, request, render_template_string, send_from_directory
-    app = Flask(_name_)
-    upload_folder = os.path.join(os.path.dirname(_file_), "uploads")
+    from flask import Flask, request, send_from_directory
+    app = Flask(__name__)
+    # Behind nginx/apache, hand uploads back via the X-Sendfile header so the
+    # front-end server streams them with zero-copy sendfile(2) instead of the
+    # bytes going through Python (nginx: map the header to X-Accel-Redirect).
+    # Must stay off for the bare dev server, hence the env-var opt-in.
+    app.use_x_sendfile = os.environ.get("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+    upload_folder = os.path.join(os.path.dirname(__file__), "uploads")
     os.makedirs(upload_folder, exist_ok=True)
 
+    # Warm the local model up front so the first user doesn't pay the
+    # load + first-forward cost. Skipped when the server was launched in
+    # API mode (no point downloading gigabytes of weights that won't be
+    # used) or when local deps are missing.
+    if not use_api and _have_transformers and _have_torch:
+        try:
+            if torch.cuda.is_available():
+                # fixed 384x384 input size -> let cuDNN autotune the convs once
+                torch.backends.cudnn.benchmark = True
+            ensure_local_pipeline(model_name, quant=quant)
+            generate_caption_local(Image.new("RGB", (384, 384)), max_length=8)
+            print("Model warmed up.")
+        except Exception as e:
+            print("Warning: model warm-up failed:", e)
+
     @app.route("/", methods=["GET", "POST"])
     def index():
         caption = None
@@ -222,16 +492,42 @@ def run_flask_server(model_name="Salesforce/blip-image-captioning-base"):
             if f:
                 filename = f.filename
                 save_path = os.path.join(upload_folder, filename)
-                f.save(save_path)
-                try:
-                    caption = generate_caption(save_path, use_api=use_api)
-                except Exception as e:
-                    caption = "ERROR: " + str(e)
-        return render_template_string(HTML_TEMPLATE, caption=caption, filename=filename, use_api=use_api)
+                # read the upload once: bytes are hashed for the cache and
+                # written to disk (off-thread) for the <img src> preview
+                data = f.read()
+                save_future = _io_pool.submit(_write_bytes, save_path, data)
+                key = _caption_cache_key(data, model_name, 40, use_api)
+                caption = _caption_cache_get(key)
+                if caption is None:
+                    try:
+                        # decode once from the in-memory bytes; the disk write
+                        # only feeds the <img src> preview and runs in parallel
+                        img = _open_small(io.BytesIO(data))
+                        # Image.open is lazy: the size is known before any
+                        # pixels are decoded. JPEGs have already been drafted
+                        # down; formats draft() can't shrink (PNG etc.) get
+                        # bounds-checked so one decompression-bomb upload
+                        # can't starve every other request.
+                        if max(img.size) > _MAX_UPLOAD_SIDE:
+                            raise RuntimeError(
+                                "image too large (%dx%d); longest side must be <= %d px"
+                                % (img.size[0], img.size[1], _MAX_UPLOAD_SIDE)
+                            )
+                        img.load()
+                        caption = _infer_pool.submit(
+                            generate_caption_pil, img, use_api=use_api, model_name=model_name
+                        ).result()
+                        _caption_cache_put(key, caption)
+                    except Exception as e:
+                        caption = "ERROR: " + str(e)
+                save_future.result()
+        return _tmpl.render(caption=caption, filename=filename, use_api=use_api)
 
     @app.route("/uploads/<path:filename>")
     def uploaded_file(filename):
-        return send_from_directory(upload_folder, filename)
+        # conditional=True enables ETag/304 and Range handling, so browser
+        # re-fetches of the preview cost headers instead of the whole file
+        return send_from_directory(upload_folder, filename, conditional=True)
 
     print("Starting Flask web UI on http://127.0.0.1:5000")
     app.run(debug=False, host="0.0.0.0", port=5000)
@@ -241,12 +537,16 @@ def run_flask_server(model_name="Salesforce/blip-image-captioning-base"):
 # ---------------------------
 def main():
     parser = argparse.ArgumentParser(description="Image caption generator (local model or HF inference API).")
-    parser.add_argument("--image", "-i", help="Path to image file to caption.")
+    parser.add_argument("--image", "-i", nargs="+", help="Path(s) to image file(s) to caption.")
+    parser.add_argument("--image-dir", help="Caption every image in this directory.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for local-model captioning of multiple images.")
     parser.add_argument("--web", action="store_true", help="Run small Flask web UI.")
     parser.add_argument("--use-api", action="store_true", help="Use Hugging Face Inference API instead of local model.")
     parser.add_argument("--hf-token", help="Hugging Face API token (optional). If not provided, reads HF_API_TOKEN env var.")
     parser.add_argument("--model", default="Salesforce/blip-image-captioning-base", help="Model name to use (local or API).")
     parser.add_argument("--max-length", type=int, default=40, help="Max tokens / length for caption generation.")
+    parser.add_argument("--beam-size", type=int, default=1, help="Beam width for local decoding. 1 (greedy) is ~3x faster than 3 with little quality loss.")
+    parser.add_argument("--quant", choices=["int8"], help="Quantize the local model: 8-bit weights via bitsandbytes on GPU, dynamic int8 linears on CPU.")
     args = parser.parse_args()
 
     # If user asked for web UI
@@ -262,17 +562,26 @@ def main():
             print("Warning: transformers/torch not installed. Running web UI in local model mode will fail until installed.")
             print("You can use the checkbox 'Use Hugging Face API' in the UI if you have HF_API_TOKEN.")
             pip_install_hint(["transformers", "torch", "pillow"])
-        run_flask_server(model_name=args.model)
+        run_flask_server(model_name=args.model, quant=args.quant, use_api=args.use_api)
         return
 
     # CLI image caption
-    if args.image:
-        img_path = args.image
-        if not os.path.isfile(img_path):
-            print("Image file not found:", img_path)
+    if args.image or args.image_dir:
+        img_paths = list(args.image or [])
+        if args.image_dir:
+            import glob
+            for ext in ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.gif", "*.webp"):
+                img_paths.extend(glob.glob(os.path.join(args.image_dir, ext)))
+            img_paths = sorted(set(img_paths))
+        if not img_paths:
+            print("No images found to caption.")
             sys.exit(1)
+        for img_path in img_paths:
+            if not os.path.isfile(img_path):
+                print("Image file not found:", img_path)
+                sys.exit(1)
         # Decide mode
-        use_api = args.use_api or (os.environ.get("HF_API_TOKEN") is not None)
+        use_api = args.use_api or (_HF_TOKEN is not None)
         if use_api and not _have_requests:
             print("requests is required for API mode. Install with: pip install requests")
             pip_install_hint(["requests"])
@@ -283,11 +592,24 @@ def main():
             print("To avoid downloading a model locally, rerun with --use-api and set HF_API_TOKEN env variable.")
             sys.exit(1)
 
-        print("Generating caption (model=%s) ..." % args.model)
+        print("Generating caption%s (model=%s) ..." % ("s" if len(img_paths) > 1 else "", args.model))
         try:
-            caption = generate_caption(img_path, use_api=use_api, hf_token=args.hf_token, model_name=args.model, max_length=args.max_length)
-            print("Caption:")
-            print(caption)
+            if use_api:
+                if len(img_paths) > 1:
+                    # API mode, many images: overlap the round-trips
+                    captions = caption_via_hf_api_many(img_paths, hf_token=args.hf_token, model=args.model, max_length=args.max_length)
+                else:
+                    captions = [generate_caption(img_paths[0], use_api=True, hf_token=args.hf_token, model_name=args.model, max_length=args.max_length)]
+            else:
+                # Local mode: one batched pipeline call for all images
+                ensure_local_pipeline(args.model, quant=args.quant)
+                captions = generate_caption_local(img_paths, batch_size=args.batch_size, max_length=args.max_length, num_beams=args.beam_size)
+            if len(img_paths) == 1:
+                print("Caption:")
+                print(captions[0])
+            else:
+                for p, c in zip(img_paths, captions):
+                    print("%s: %s" % (p, c))
         except Exception as e:
             print("Failed to generate caption:", e)
             print("If you're on an iPad, consider using the Hugging Face Inference API mode (--use-api) with HF_API_TOKEN set.")
@@ -297,5 +619,5 @@ def main():
     # No args: show help
     parser.print_help()
 
-if_name_ == "_main_":
+if __name__ == "__main__":
     main()
\ No newline at end of file